@@ -0,0 +1,191 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Any, Optional, Tuple
+
+# File-backed so every server worker process shares the same entries.
+# Set RESPONSE_CACHE_PATH to an empty string to disable caching.
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", "./cache/responses.db")
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# Once over the limit, prune down to this fraction of it so that pruning
+# runs once per batch of writes rather than on every write
+PRUNE_TARGET = 0.9
+
+# Bumped whenever the table layout or value encoding changes; older
+# databases are dropped and rebuilt on open
+SCHEMA_VERSION = 2
+
+# Value encodings: lists of floats (embeddings) are stored as packed float32,
+# about a fifth of their JSON size; everything else is stored as JSON
+ENCODING_JSON = 0
+ENCODING_FLOAT32 = 1
+
+
+def cache_key(*parts: str) -> str:
+    """Hash everything that determines a cached value into one key."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def encode_value(value: Any) -> Tuple[int, bytes]:
+    """Serialize `value`, packing non-empty lists of floats as float32."""
+    if isinstance(value, list) and value and all(type(v) is float for v in value):
+        return ENCODING_FLOAT32, array("f", value).tobytes()
+    return ENCODING_JSON, json.dumps(value).encode()
+
+
+def decode_value(encoding: int, data: bytes) -> Any:
+    if encoding == ENCODING_FLOAT32:
+        values = array("f")
+        values.frombytes(data)
+        return values.tolist()
+    return json.loads(data)
+
+
+class ResponseCache:
+    """SQLite-backed key/value cache shared between processes.
+
+    Uses WAL mode so concurrent readers in other workers are not blocked by
+    a writer. Connections are opened per thread and per process. The size
+    limit is checked against the database's page usage on every write, so
+    it holds no matter how many processes write to the same file.
+    """
+
+    def __init__(self, path: str, max_bytes: int = RESPONSE_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            (version,) = conn.execute("PRAGMA user_version").fetchone()
+            if version != SCHEMA_VERSION:
+                conn.execute("DROP TABLE IF EXISTS entries")
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries "
+                "(key TEXT PRIMARY KEY, encoding INTEGER NOT NULL, value BLOB NOT NULL, "
+                "size INTEGER NOT NULL, created REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_created ON entries (created)")
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            row = self._connect().execute(
+                "SELECT encoding, value FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logging.warning(f"Response cache read failed: {e}")
+            return None
+        return decode_value(*row) if row else None
+
+    def set(self, key: str, value: Any):
+        encoding, data = encode_value(value)
+        try:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, encoding, value, size, created) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, encoding, data, len(data), time.time()),
+                )
+                used = self.used_bytes()
+                if used > self.max_bytes:
+                    self._prune(conn, used)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            logging.warning(f"Response cache write failed: {e}")
+
+    def used_bytes(self) -> int:
+        """Bytes of database pages in use, excluding free pages awaiting reuse."""
+        conn = self._connect()
+        (page_size,) = conn.execute("PRAGMA page_size").fetchone()
+        (page_count,) = conn.execute("PRAGMA page_count").fetchone()
+        (free_pages,) = conn.execute("PRAGMA freelist_count").fetchone()
+        return (page_count - free_pages) * page_size
+
+    def _prune(self, conn: sqlite3.Connection, used: int):
+        """Drop the oldest entries until roughly `PRUNE_TARGET * max_bytes` is in use.
+
+        Page usage includes keys, indexes and page slack, so the share of
+        pages to free is applied to the stored value sizes.
+        """
+        (total,) = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()
+        drop = total * (1.0 - PRUNE_TARGET * self.max_bytes / used)
+        conn.execute(
+            "DELETE FROM entries WHERE key IN ("
+            " SELECT key FROM ("
+            "  SELECT key, size, SUM(size) OVER (ORDER BY created, key ROWS UNBOUNDED PRECEDING) AS running"
+            "  FROM entries"
+            " ) WHERE running - size < ?"
+            ")",
+            (drop,),
+        )
+
+
+def open_response_cache(path: str) -> Optional[ResponseCache]:
+    """Open the cache at `path`, recreating a corrupt file; None if it cannot be used."""
+    try:
+        try:
+            return ResponseCache(path)
+        except sqlite3.DatabaseError as e:
+            # OperationalError (e.g. locked by another worker) does not mean corruption
+            if isinstance(e, sqlite3.OperationalError):
+                raise
+            # Entries can always be regenerated, so start over rather than run uncached
+            logging.warning(f"Response cache at {path} is unreadable ({e}); recreating it")
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+            return ResponseCache(path)
+    except (OSError, sqlite3.Error) as e:
+        logging.warning(f"Response cache at {path} is unavailable, running without it: {e}")
+        return None
+
+
+_response_cache = None
+_response_cache_opened = False
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Return the shared response cache, or None when caching is disabled or unavailable."""
+    global _response_cache, _response_cache_opened
+    if not RESPONSE_CACHE_PATH:
+        return None
+    with _response_cache_lock:
+        if not _response_cache_opened:
+            # Only tried once per process, so a bad path doesn't cost every request
+            _response_cache = open_response_cache(RESPONSE_CACHE_PATH)
+            _response_cache_opened = True
+    return _response_cache
@@ -0,0 +1,213 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+# A grader scores a prediction against the reference answer: (question, reference, prediction) -> [0, 1]
+Grader = Callable[[str, str, str], float]
+
+EVAL_CACHE_PATH = os.getenv("EVAL_CACHE_PATH", ".eval_cache.json")
+
+# Upper bound on concurrent predictions/gradings in one evaluation run
+MAX_CONCURRENCY = 32
+
+
+def config_hash(config: Dict) -> str:
+    """Stable hash of a pipeline configuration."""
+    return hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def example_key(question: str, pipeline_hash: str) -> str:
+    """Cache key for one example under one pipeline configuration."""
+    return hashlib.sha256(f"{pipeline_hash}\0{question}".encode()).hexdigest()
+
+
+class EvaluationCache:
+    """Per-example evaluation results persisted to a JSON file.
+
+    Entries are keyed by `example_key`, so changing the pipeline configuration
+    invalidates them while unchanged examples are skipped on re-runs.
+    """
+
+    def __init__(self, path: Optional[str] = EVAL_CACHE_PATH):
+        self.path = path
+        self._entries: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        if path and os.path.exists(path):
+            try:
+                with open(path) as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.warning(f"Ignoring unreadable evaluation cache {path}: {e}")
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            return self._entries.get(key)
+
+    def set(self, key: str, entry: Dict):
+        with self._lock:
+            self._entries[key] = entry
+            self._dirty = True
+
+    def add_grade(self, key: str, grade_key: str, score: float):
+        with self._lock:
+            self._entries[key]["grades"][grade_key] = score
+            self._dirty = True
+
+    def save(self):
+        """Write the cache atomically if anything changed."""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def exact_match_grader(question: str, reference: str, prediction: str) -> float:
+    return float(_normalize(reference) == _normalize(prediction))
+
+
+def contains_grader(question: str, reference: str, prediction: str) -> float:
+    return float(_normalize(reference) in _normalize(prediction))
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def summarize_step_latencies(results: List[Dict]) -> Dict[str, Dict[str, float]]:
+    """Aggregate per-step latencies (seconds) across example results."""
+    by_step: Dict[str, List[float]] = {}
+    for result in results:
+        for step in result.get("step_latencies", []):
+            by_step.setdefault(step["step"], []).append(step["seconds"])
+
+    summary = {}
+    for step, values in by_step.items():
+        values.sort()
+        summary[step] = {
+            "count": len(values),
+            "mean": sum(values) / len(values),
+            "p50": _percentile(values, 50),
+            "p95": _percentile(values, 95),
+            "max": values[-1],
+        }
+    return summary
+
+
+def run_evaluation(
+    examples: List[Dict],
+    predict: Callable[[Dict], Dict],
+    grader: Grader,
+    grader_name: str,
+    pipeline_hash: str,
+    cache: Optional[EvaluationCache] = None,
+    concurrency: int = 4,
+    grader_fingerprint: str = "",
+) -> Dict:
+    """Run `predict` over `examples` with bounded concurrency and grade the answers.
+
+    `predict` takes `{"input": question}` and returns `response`, `steps` and
+    optionally `step_latencies`. Predictions are cached per (question,
+    pipeline hash); grades are reused when the reference answer, grader name
+    and `grader_fingerprint` (e.g. a hash of an LLM grader's prompt and
+    model) are unchanged as well.
+    """
+    started = time.perf_counter()
+    cache = cache if cache is not None else EvaluationCache(path=None)
+
+    # Identical questions share one prediction
+    pending: Dict[str, str] = {}
+    keys = []
+    for example in examples:
+        key = example_key(example["input"], pipeline_hash)
+        keys.append(key)
+        if cache.get(key) is None:
+            pending.setdefault(key, example["input"])
+
+    def run_one(key: str, question: str):
+        example_started = time.perf_counter()
+        try:
+            prediction = predict({"input": question})
+            entry = {
+                "response": prediction["response"],
+                "steps": prediction["steps"],
+                "step_latencies": prediction.get("step_latencies", []),
+                "latency": time.perf_counter() - example_started,
+                "grades": {},
+            }
+            cache.set(key, entry)
+        except Exception as e:
+            logging.error(f"Error evaluating example {question!r}: {e}")
+            return key, str(e)
+        return key, None
+
+    errors: Dict[str, str] = {}
+
+    def grade_one(example: Dict, key: str) -> Dict:
+        result = {"input": example["input"], "reference": example["output"], "cached": key not in pending}
+        entry = cache.get(key)
+        if entry is None:
+            result.update({"error": errors.get(key, "No prediction"), "score": 0.0})
+            return result
+
+        grade_key = f"{grader_name}\0{grader_fingerprint}\0{example['output']}"
+        score = entry["grades"].get(grade_key)
+        if score is None:
+            try:
+                score = float(grader(example["input"], example["output"], entry["response"]))
+            except Exception as e:
+                logging.error(f"Error grading example {example['input']!r}: {e}")
+                result.update({"error": f"Grading failed: {e}", "score": 0.0})
+                return result
+            cache.add_grade(key, grade_key, score)
+
+        result.update({
+            "response": entry["response"],
+            "steps": entry["steps"],
+            "step_latencies": entry["step_latencies"],
+            "latency": entry["latency"],
+            "score": score,
+        })
+        return result
+
+    try:
+        with ThreadPoolExecutor(max_workers=min(max(1, concurrency), MAX_CONCURRENCY)) as executor:
+            for key, error in executor.map(lambda item: run_one(*item), pending.items()):
+                if error is not None:
+                    errors[key] = error
+            results = list(executor.map(grade_one, examples, keys))
+    finally:
+        cache.save()
+
+    graded = [r for r in results if "error" not in r]
+    return {
+        "accuracy": sum(r["score"] for r in results) / len(results) if results else 0.0,
+        "num_examples": len(results),
+        "num_cached": sum(1 for r in results if r["cached"]),
+        "num_errors": len(results) - len(graded),
+        "grader": grader_name,
+        "pipeline_hash": pipeline_hash,
+        "duration": time.perf_counter() - started,
+        "step_latency": summarize_step_latencies(graded),
+        "results": results,
+    }
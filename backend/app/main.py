@@ -4,10 +4,11 @@ import socket
 import subprocess
 import time
 import logging
-import psutil
 import re
 import json
 import hashlib
+import threading
+from functools import lru_cache
 
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
@@ -17,17 +18,12 @@ from typing import Dict, List
 from dotenv import load_dotenv
 from contextlib import asynccontextmanager
 
-import firebase_admin
-from firebase_admin import credentials, firestore
-from firebase_admin.exceptions import FirebaseError
-
-from langchain_ollama import ChatOllama
-from langchain.prompts import PromptTemplate
-from langchain_core.output_parsers import StrOutputParser
-from langchain_community.embeddings import OllamaEmbeddings
+# firebase_admin, langchain and psutil are imported on first use to keep
+# cold start (and time to the first `/` response) short.
 
 import sys
 
+from app.cache import cache_key, get_response_cache
 from app.database.firebase import fetch_and_list_doc_types
 
 # Load environment variables from .env file
@@ -63,12 +59,24 @@ os.environ['OLLAMA_MODELS'] = OLLAMA_MODELS_DIR
 OLLAMA_PORT = 11434  # Default Ollama port
 SERVER_PORT = 8001    # FastAPI server port
 
+# Base URL the LLM and embedding clients talk to (overridable, e.g. for benchmarks)
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", f"http://localhost:{OLLAMA_PORT}")
+
 # List of models to manage
 ollama_models = ['llama3:8b']
 
 # Initialize global variable for Ollama subprocess
 ollama_process = None
 
+# Ollama may be started from a background thread; the lock makes checking for
+# shutdown and spawning the process atomic with respect to terminate_ollama,
+# so a shutdown during startup cannot orphan a freshly spawned Ollama.
+ollama_lock = threading.Lock()
+ollama_shutdown = threading.Event()
+
+# Set by server.py in multi-worker mode, where the supervisor process owns Ollama
+OLLAMA_SUPERVISED = os.getenv("OLLAMA_SUPERVISED") == "1"
+
 def is_port_in_use(port):
     """Check if a port is in use."""
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
@@ -80,6 +88,8 @@ def is_port_in_use(port):
 
 def is_ollama_running():
     """Check if the Ollama process is running."""
+    import psutil
+
     for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
         if proc.info['name'] and 'ollama' in proc.info['name']:
             return True
@@ -93,7 +103,13 @@ def start_ollama():
 
     print("Starting Ollama...", OLLAMA_BINARY_PATH)
     global ollama_process
-    if not is_ollama_running():
+    with ollama_lock:
+        if ollama_shutdown.is_set():
+            logging.info("Shutdown requested; not starting Ollama.")
+            return
+        if is_ollama_running():
+            logging.info("Ollama is already running.")
+            return
         try:
             env = os.environ.copy()
             env['OLLAMA_MODELS'] = OLLAMA_MODELS_DIR  # Ensure models directory is set
@@ -108,24 +124,33 @@ def start_ollama():
                 env=env
             )
             logging.info(f"Ollama started with PID {ollama_process.pid}")
-            # Wait for Ollama to be ready
-            timeout = 30  # seconds
-            start_time = time.time()
-            while time.time() - start_time < timeout:
-                if is_port_in_use(OLLAMA_PORT):
-                    logging.info("Ollama is up and running.")
-                    return
-                time.sleep(1)
-            raise Exception("Ollama did not start within the expected time.")
         except Exception as e:
             logging.error(f"Failed to start Ollama: {e}")
             raise
-    else:
-        logging.info("Ollama is already running.")
+
+    try:
+        # Wait for Ollama to be ready
+        timeout = 30  # seconds
+        start_time = time.time()
+        while time.time() - start_time < timeout and not ollama_shutdown.is_set():
+            if is_port_in_use(OLLAMA_PORT):
+                logging.info("Ollama is up and running.")
+                return
+            time.sleep(1)
+        if ollama_shutdown.is_set():
+            return
+        raise Exception("Ollama did not start within the expected time.")
+    except Exception as e:
+        logging.error(f"Failed to start Ollama: {e}")
+        raise
 
 def terminate_ollama():
-    """Terminate the Ollama subprocess."""
-    global ollama_process
+    """Terminate the Ollama subprocess, and stop a pending start from spawning one."""
+    ollama_shutdown.set()
+    with ollama_lock:
+        _terminate_ollama_process()
+
+def _terminate_ollama_process():
     if ollama_process and ollama_process.poll() is None:
         try:
             ollama_process.terminate()
@@ -141,11 +166,24 @@ def terminate_ollama():
     else:
         logging.info("No Ollama process to terminate.")
 
+def start_ollama_in_background():
+    """Start Ollama, logging instead of raising since no caller can handle it."""
+    try:
+        start_ollama()
+    except Exception:
+        # start_ollama already logged the cause
+        pass
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan context manager for startup and shutdown events."""
-    # Startup code
-    start_ollama()
+    if OLLAMA_SUPERVISED:
+        # Another process starts and stops Ollama for all workers
+        yield
+        return
+    # Startup code: start Ollama in the background so the API can answer
+    # right away; clients wait for the Ollama port separately.
+    threading.Thread(target=start_ollama_in_background, daemon=True).start()
     yield
     # Shutdown code
     terminate_ollama()
@@ -197,28 +235,124 @@ class ModelCheckRequest(BaseModel):
 class ModelCheckResponse(BaseModel):
     missing_models: List[str]
 
-# Define the Ollama LLM for documentation and unit test generation
-llm = ChatOllama(model=ollama_models[0], temperature=0)
-doc_prompt = PromptTemplate(
-    template="""You are an AI assistant tasked with generating documentation in 5 sentences for the following functions or classes.
+# Prompts for documentation and unit test generation
+DOC_PROMPT_TEMPLATE = """You are an AI assistant tasked with generating documentation in 5 sentences for the following functions or classes.
     {function_code}
     Documentation:
-    """,
-    input_variables=["function_code"]
-)
+    """
 
-test_prompt = PromptTemplate(
-    template="""You are an AI assistant tasked with generating unit tests for the following function or class in the same programming language.
+TEST_PROMPT_TEMPLATE = """You are an AI assistant tasked with generating unit tests for the following function or class in the same programming language.
     {function_code}
     Unit Test:
-    """,
-    input_variables=["function_code"]
-)
-
-doc_chain = doc_prompt | llm | StrOutputParser()
-test_chain = test_prompt | llm | StrOutputParser()
-
-ollama_emb = OllamaEmbeddings(model=ollama_models[0])
+    """
+
+# Edit-style prompts used when a near-duplicate was already processed
+DOC_EDIT_PROMPT_TEMPLATE = """You are an AI assistant tasked with generating documentation in 5 sentences for the following functions or classes.
+    Documentation was already written for this very similar code:
+    {reference_code}
+    Existing documentation:
+    {reference_output}
+    Adapt the existing documentation to the code below, changing only what differs.
+    {function_code}
+    Documentation:
+    """
+
+TEST_EDIT_PROMPT_TEMPLATE = """You are an AI assistant tasked with generating unit tests for the following function or class in the same programming language.
+    Unit tests were already written for this very similar code:
+    {reference_code}
+    Existing unit tests:
+    {reference_output}
+    Adapt the existing unit tests to the code below, changing only what differs.
+    {function_code}
+    Unit Test:
+    """
+
+# The Ollama LLM, chains and embeddings are built on first use
+@lru_cache(maxsize=None)
+def get_llm():
+    """Return the Ollama LLM used for documentation and unit test generation."""
+    from langchain_ollama import ChatOllama
+
+    return ChatOllama(model=ollama_models[0], temperature=0, base_url=OLLAMA_BASE_URL)
+
+def build_chain(template: str, input_variables=("function_code",)):
+    """Build a prompt | llm | parser chain for `template`."""
+    from langchain.prompts import PromptTemplate
+    from langchain_core.output_parsers import StrOutputParser
+
+    prompt = PromptTemplate(template=template, input_variables=list(input_variables))
+    return prompt | get_llm() | StrOutputParser()
+
+EDIT_INPUT_VARIABLES = ("reference_code", "reference_output", "function_code")
+
+@lru_cache(maxsize=None)
+def get_doc_chain():
+    return build_chain(DOC_PROMPT_TEMPLATE)
+
+@lru_cache(maxsize=None)
+def get_test_chain():
+    return build_chain(TEST_PROMPT_TEMPLATE)
+
+@lru_cache(maxsize=None)
+def get_doc_edit_chain():
+    return build_chain(DOC_EDIT_PROMPT_TEMPLATE, EDIT_INPUT_VARIABLES)
+
+@lru_cache(maxsize=None)
+def get_test_edit_chain():
+    return build_chain(TEST_EDIT_PROMPT_TEMPLATE, EDIT_INPUT_VARIABLES)
+
+@lru_cache(maxsize=None)
+def get_ollama_emb():
+    from langchain_community.embeddings import OllamaEmbeddings
+
+    return OllamaEmbeddings(model=ollama_models[0], base_url=OLLAMA_BASE_URL)
+
+def invoke_chain(chain, inputs: Dict[str, str]) -> str:
+    """Run a generation chain and return its text output."""
+    response = chain.invoke(inputs)
+    if hasattr(response, 'content'):
+        return response.content
+    elif isinstance(response, str):
+        return response
+    raise ValueError("Invalid response format")
+
+def cached_call(namespace: str, template: str, text: str, compute):
+    """Return the cached result for `text`, computing and storing it on a miss.
+
+    The cache is shared by all server workers; keys include the model and
+    prompt template so changing either invalidates old entries.
+    """
+    cache = get_response_cache()
+    if cache is None:
+        return compute()
+    key = cache_key(namespace, ollama_models[0], template, text)
+    result = cache.get(key)
+    if result is None:
+        result = compute()
+        cache.set(key, result)
+    return result
+
+def generate_for_unit(namespace: str, function_code: str, chain, edit_chain) -> str:
+    """Generate output for a code unit, reusing work done for near-duplicates.
+
+    A close enough match in the similarity index is returned directly, a
+    looser one is used as the basis of an edit-style prompt, and anything
+    else gets a full generation.
+    """
+    # Imported here so numpy stays off the startup path
+    from app.similarity import generate_with_reuse, get_similarity_index
+
+    return generate_with_reuse(
+        get_similarity_index(),
+        namespace,
+        function_code,
+        generate=lambda: invoke_chain(chain(), {"function_code": function_code}),
+        edit=lambda match: invoke_chain(edit_chain(), {
+            "reference_code": match.code,
+            "reference_output": match.output,
+            "function_code": function_code,
+        }),
+    )
 
 async def install_models_stream(request: ModelInstallRequest):
     """Stream the model installation process."""
@@ -300,13 +434,10 @@ async def generate_docs(request: GenerateDocsRequest):
     """Endpoint to generate documentation for given function or class code."""
     try:
         function_code = request.function_code
-        response = doc_chain.invoke({"function_code": function_code})
-        if hasattr(response, 'content'):
-            documentation = response.content
-        elif isinstance(response, str):
-            documentation = response
-        else:
-            raise ValueError("Invalid response format")
+        documentation = cached_call(
+            "docs", DOC_PROMPT_TEMPLATE, function_code,
+            lambda: generate_for_unit("docs", function_code, get_doc_chain, get_doc_edit_chain),
+        )
         return GenerateDocsResponse(documentation=documentation)
     except Exception as e:
         logging.error(f"Error generating documentation: {e}")
@@ -317,13 +448,10 @@ async def generate_tests(request: GenerateTestsRequest):
     """Endpoint to generate unit tests for given function or class code."""
     try:
         function_code = request.function_code
-        response = test_chain.invoke({"function_code": function_code})
-        if hasattr(response, 'content'):
-            test_code = response.content
-        elif isinstance(response, str):
-            test_code = response
-        else:
-            raise ValueError("Invalid response format")
+        test_code = cached_call(
+            "tests", TEST_PROMPT_TEMPLATE, function_code,
+            lambda: generate_for_unit("tests", function_code, get_test_chain, get_test_edit_chain),
+        )
         return GenerateTestsResponse(test_code=test_code)
     except Exception as e:
         logging.error(f"Error generating unit tests: {e}")
@@ -333,7 +461,10 @@ async def generate_tests(request: GenerateTestsRequest):
 async def get_embeddings(request: GetEmbeddingsRequest):
     """Endpoint to get embeddings for the provided text."""
     try:
-        embeddings = ollama_emb.embed_query(request.text)
+        embeddings = cached_call(
+            "embeddings", "", request.text,
+            lambda: get_ollama_emb().embed_query(request.text),
+        )
         return GetEmbeddingsResponse(embeddings=embeddings)
     except Exception as e:
         logging.error(f"Error getting embeddings: {e}")
@@ -342,6 +473,10 @@ async def get_embeddings(request: GetEmbeddingsRequest):
 @app.post("/compare-documents")
 async def compare_documents(request: CollectionRequest):
     """Endpoint to compare documents in a Firebase collection."""
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+    from firebase_admin.exceptions import FirebaseError
+
     collection_name = request.collection_name
     service_account = request.service_account
 
@@ -368,6 +503,16 @@ async def compare_documents(request: CollectionRequest):
         logging.error(f"Exception: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch and compare documents.")
 
+@app.get("/similarity-stats")
+async def similarity_stats():
+    """Endpoint reporting how often near-duplicate code reused earlier outputs."""
+    from app.similarity import get_similarity_index
+
+    index = get_similarity_index()
+    if index is None:
+        return {"enabled": False, "namespaces": {}}
+    return {"enabled": True, "namespaces": index.stats()}
+
 @app.get("/")
 def read_root():
     """Root endpoint to verify server status."""
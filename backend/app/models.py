@@ -1,5 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Dict
+from .evaluation import MAX_CONCURRENCY
 
 class CRAGRequest(BaseModel):
     question: str
@@ -14,3 +15,5 @@ class EvaluationExample(BaseModel):
 
 class EvaluationRequest(BaseModel):
     examples: List[EvaluationExample]
+    grader: str = "llm"
+    concurrency: int = Field(4, ge=1, le=MAX_CONCURRENCY)
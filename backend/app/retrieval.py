@@ -0,0 +1,354 @@
+import math
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Very common words carry no signal for BM25 and produce the longest posting lists
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have how i in is it its of on or "
+    "that the this to was were what when where which who why will with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens with stopwords removed."""
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def _grow(arr: np.ndarray, needed: int, minimum: int = 1024) -> np.ndarray:
+    """Return `arr` with room for at least `needed` rows, doubling its capacity.
+
+    Rows below the old size are never written again, so views of them taken
+    before the copy stay valid for concurrent readers.
+    """
+    if needed <= arr.shape[0]:
+        return arr
+    capacity = max(needed, arr.shape[0] * 2, minimum)
+    grown = np.empty((capacity,) + arr.shape[1:], dtype=arr.dtype)
+    grown[:arr.shape[0]] = arr
+    return grown
+
+
+class LRUCache:
+    """Thread-safe least-recently-used cache."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, object]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key: Hashable, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class _Postings:
+    """Append-only posting list for one term.
+
+    `head` caches the highest-impact postings among the first `sealed`
+    entries as `(sealed, ids, tfs)`, so common terms are scored from a
+    bounded slice instead of their whole list.
+    """
+
+    __slots__ = ("ids", "tfs", "count", "head")
+
+    def __init__(self):
+        self.ids = np.empty(0, dtype=np.int32)
+        self.tfs = np.empty(0, dtype=np.float32)
+        self.count = 0
+        self.head: Optional[Tuple[int, np.ndarray, np.ndarray]] = None
+
+    def extend(self, ids: Sequence[int], tfs: Sequence[int]):
+        end = self.count + len(ids)
+        self.ids = _grow(self.ids, end, minimum=8)
+        self.tfs = _grow(self.tfs, end, minimum=8)
+        self.ids[self.count:end] = ids
+        self.tfs[self.count:end] = tfs
+        self.count = end
+
+
+class BM25Index:
+    """Inverted index with Okapi BM25 scoring that supports appending documents.
+
+    Posting lists are NumPy blocks. Scoring only touches the posting lists of
+    the query terms, and each list is capped at `max_postings` entries: past
+    that, only the entries with the highest BM25 term impact (plus the ones
+    appended since the cap was last applied) are scored. Terms found in more
+    than `max_df_ratio` of the documents are skipped when the query has rarer
+    terms. Both bounds make scores approximate for very common terms, which
+    is fine for candidate generation.
+
+    Not thread-safe for writes; readers call `snapshot` while holding the
+    writer's lock and score the snapshot after releasing it.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, max_postings: int = 1000, max_df_ratio: float = 0.5):
+        self.k1 = k1
+        self.b = b
+        self.max_postings = max_postings
+        self.max_df_ratio = max_df_ratio
+        self._postings: Dict[str, _Postings] = {}
+        self._doc_lens = np.empty(0, dtype=np.int32)
+        self._size = 0
+        self._total_len = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, token_lists: Sequence[List[str]]):
+        self._doc_lens = _grow(self._doc_lens, self._size + len(token_lists))
+        # Gather the batch per term so each posting list grows once
+        batch: Dict[str, Tuple[List[int], List[int]]] = {}
+        for offset, tokens in enumerate(token_lists):
+            doc_id = self._size + offset
+            counts: Dict[str, int] = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for term, tf in counts.items():
+                entry = batch.get(term)
+                if entry is None:
+                    entry = batch[term] = ([], [])
+                entry[0].append(doc_id)
+                entry[1].append(tf)
+            self._doc_lens[doc_id] = len(tokens)
+            self._total_len += len(tokens)
+        for term, (ids, tfs) in batch.items():
+            posting = self._postings.get(term)
+            if posting is None:
+                posting = self._postings[term] = _Postings()
+            posting.extend(ids, tfs)
+        self._size += len(token_lists)
+
+    def snapshot(self, terms: Sequence[str]) -> "BM25Snapshot":
+        """Capture the state needed to score `terms`, in time proportional to the number of terms."""
+        lists = []
+        for term in set(terms):
+            posting = self._postings.get(term)
+            if posting is not None:
+                lists.append((posting, posting.ids, posting.tfs, posting.count, posting.head))
+        return BM25Snapshot(self, lists, self._size, self._total_len, self._doc_lens)
+
+    def search(self, terms: Sequence[str], limit: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return up to `limit` (document ids, scores), best first."""
+        return self.snapshot(terms).search(limit)
+
+
+class BM25Snapshot:
+    """Query terms' posting lists frozen at one corpus size.
+
+    Posting arrays are only appended to, so slicing them to the captured
+    counts gives a consistent view while new documents are being added.
+    """
+
+    def __init__(self, index: BM25Index, lists, size: int, total_len: int, doc_lens: np.ndarray):
+        self.index = index
+        self.lists = lists
+        self.size = size
+        self.avgdl = total_len / size if size else 0.0
+        self.doc_lens = doc_lens
+
+    def _norm(self, ids: np.ndarray) -> np.ndarray:
+        index = self.index
+        return index.k1 * (1.0 - index.b + index.b * self.doc_lens[ids] / self.avgdl)
+
+    def _bounded(self, posting: _Postings, ids: np.ndarray, tfs: np.ndarray, count: int, head):
+        """At most about `2 * max_postings` of the highest-impact and newest entries."""
+        cap = self.index.max_postings
+        if count <= cap:
+            return ids[:count], tfs[:count]
+        if head is None or count - head[0] > cap:
+            ids, tfs = ids[:count], tfs[:count]
+            impact = tfs / (tfs + self._norm(ids))
+            top = np.argpartition(-impact, cap - 1)[:cap]
+            head = (count, ids[top], tfs[top])
+            # Another reader may have stored a newer head meanwhile
+            if posting.head is None or posting.head[0] < count:
+                posting.head = head
+        sealed, head_ids, head_tfs = head
+        if sealed == count:
+            return head_ids, head_tfs
+        return np.concatenate([head_ids, ids[sealed:count]]), np.concatenate([head_tfs, tfs[sealed:count]])
+
+    def search(self, limit: int) -> Tuple[np.ndarray, np.ndarray]:
+        n = self.size
+        empty = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        if not n or not self.lists:
+            return empty
+        index = self.index
+
+        lists = self.lists
+        rare = [entry for entry in lists if entry[3] <= index.max_df_ratio * n]
+        if rare:
+            lists = rare
+
+        ids_parts, score_parts = [], []
+        for posting, ids, tfs, df, head in lists:
+            idf = math.log(1.0 + (n - df + 0.5) / (df + 0.5))
+            ids, tfs = self._bounded(posting, ids, tfs, df, head)
+            ids_parts.append(ids)
+            score_parts.append(idf * tfs * (index.k1 + 1.0) / (tfs + self._norm(ids)))
+
+        doc_ids, inverse = np.unique(np.concatenate(ids_parts), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(score_parts)).astype(np.float32)
+        if len(doc_ids) > limit:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            doc_ids, scores = doc_ids[top], scores[top]
+        order = np.argsort(-scores, kind="stable")
+        return doc_ids[order].astype(np.int64), scores[order]
+
+
+class VectorMatrix:
+    """Unit-normalized float32 embeddings stored in one growable NumPy matrix."""
+
+    def __init__(self):
+        self._matrix: Optional[np.ndarray] = None
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, vectors: Sequence[Sequence[float]]):
+        if not len(vectors):
+            return
+        block = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(block, axis=1, keepdims=True)
+        block /= np.where(norms == 0, 1.0, norms)
+        if self._matrix is None:
+            self._matrix = np.empty((0, block.shape[1]), dtype=np.float32)
+        self._matrix = _grow(self._matrix, self._size + len(block))
+        self._matrix[self._size:self._size + len(block)] = block
+        self._size += len(block)
+
+    def rows(self) -> np.ndarray:
+        """View of the stored rows; later appends do not change it."""
+        return self._matrix[:self._size]
+
+
+class HybridRetriever:
+    """BM25 candidate generation, vector rerank and reciprocal rank fusion.
+
+    BM25 picks `candidates` documents from the inverted index, their stored
+    embeddings are scored against the query embedding, and both rankings are
+    fused with reciprocal rank fusion. Only when BM25 finds fewer than `k`
+    documents does it fall back to scoring every stored embedding.
+
+    Query embeddings and retrieval results are kept in LRU caches; results
+    are keyed by the corpus version so `add_documents` never serves stale hits.
+    Exposes `invoke` so it can replace a LangChain retriever.
+    """
+
+    def __init__(
+        self,
+        embedding,
+        k: int = 4,
+        candidates: int = 100,
+        rrf_k: int = 60,
+        embedding_cache_size: int = 2048,
+        result_cache_size: int = 2048,
+    ):
+        self.embedding = embedding
+        self.k = k
+        self.candidates = candidates
+        self.rrf_k = rrf_k
+        self._bm25 = BM25Index()
+        self._vectors = VectorMatrix()
+        self._documents: List = []
+        self._version = 0
+        self._lock = threading.Lock()
+        self._embedding_cache = LRUCache(embedding_cache_size)
+        self._result_cache = LRUCache(result_cache_size)
+
+    def __len__(self):
+        return len(self._documents)
+
+    def add_documents(self, documents: Sequence):
+        """Index `documents` (LangChain `Document`s) without rebuilding existing data."""
+        documents = list(documents)
+        if not documents:
+            return
+        texts = [d.page_content for d in documents]
+        vectors = self.embedding.embed_documents(texts)
+        tokens = [tokenize(text) for text in texts]
+        with self._lock:
+            self._bm25.add(tokens)
+            self._vectors.add(vectors)
+            self._documents.extend(documents)
+            self._version += 1
+
+    def _embed_query(self, query: str, normalized: str) -> np.ndarray:
+        vector = self._embedding_cache.get(normalized)
+        if vector is None:
+            vector = np.asarray(self.embedding.embed_query(query), dtype=np.float32)
+            norm = np.linalg.norm(vector)
+            if norm:
+                vector /= norm
+            self._embedding_cache.set(normalized, vector)
+        return vector
+
+    def _rank(self, query: str, terms: List[str], normalized: str, k: int) -> List[int]:
+        if not self._documents:
+            return []
+        # Embed outside the lock; it may be a remote call
+        query_vector = self._embed_query(query, normalized)
+        # Only capture references under the lock; scoring runs on the snapshot
+        # so concurrent queries, and queries during add_documents, don't serialize
+        with self._lock:
+            k = min(k, len(self._documents))
+            bm25 = self._bm25.snapshot(terms)
+            rows = self._vectors.rows()
+
+        candidate_ids, _ = bm25.search(self.candidates)
+        bm25_count = len(candidate_ids)
+        if bm25_count < k:
+            # Too few lexical matches: top up with a full vector scan
+            all_sims = rows @ query_vector
+            nearest = np.argpartition(-all_sims, k - 1)[:k]
+            extra = nearest[~np.isin(nearest, candidate_ids)]
+            candidate_ids = np.concatenate([candidate_ids, extra])
+        sims = rows[candidate_ids] @ query_vector
+
+        # The first `bm25_count` candidates are in BM25 order, so position is the BM25 rank;
+        # candidates found only by the vector scan get no BM25 contribution
+        positions = np.arange(len(candidate_ids))
+        vector_rank = np.empty(len(candidate_ids), dtype=np.int64)
+        vector_rank[np.argsort(-sims, kind="stable")] = positions
+        bm25_part = np.where(positions < bm25_count, 1.0 / (self.rrf_k + 1 + positions), 0.0)
+        fused = bm25_part + 1.0 / (self.rrf_k + 1 + vector_rank)
+        order = np.argsort(-fused, kind="stable")[:k]
+        return candidate_ids[order].tolist()
+
+    def get_relevant_documents(self, query: str, k: Optional[int] = None) -> List:
+        k = k or self.k
+        terms = tokenize(query)
+        # Only case and whitespace are normalized for the caches: punctuation and
+        # non-ASCII text change the embedding ("C++" vs "C#") even where BM25 ignores them
+        normalized = " ".join(query.lower().split()) or query
+        key = (normalized, k, self._version)
+        ids = self._result_cache.get(key)
+        if ids is None:
+            ids = self._rank(query, terms, normalized, k)
+            self._result_cache.set(key, ids)
+        return [self._documents[i] for i in ids]
+
+    def invoke(self, input: str, config=None, **kwargs) -> List:
+        return self.get_relevant_documents(input, kwargs.get("k"))
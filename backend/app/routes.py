@@ -1,4 +1,5 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from .models import CRAGRequest, CRAGResponse, EvaluationRequest
 from .services import predict_custom_agent_answer, evaluate_agent
 
@@ -11,5 +12,11 @@ async def predict_answer(request: CRAGRequest):
 
 @router.post("/evaluate")
 async def evaluate_agent_route(request: EvaluationRequest):
-    results = evaluate_agent(request.examples)
+    examples = [dict(example) for example in request.examples]
+    try:
+        results = await run_in_threadpool(
+            evaluate_agent, examples, request.grader, request.concurrency
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return results
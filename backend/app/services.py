@@ -1,8 +1,8 @@
 from typing import Dict, List
+import time
 import uuid
 from langchain_community.document_loaders import WebBaseLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import SKLearnVectorStore
 # from langchain_nomic.embeddings import NomicEmbeddings
 from langchain_openai import OpenAIEmbeddings
 from langchain.schema import Document
@@ -11,6 +11,14 @@ from langchain.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser, JsonOutputParser
 from langgraph.graph import StateGraph, START, END
 from .models import CRAGRequest
+from .retrieval import HybridRetriever
+from .evaluation import (
+    EvaluationCache,
+    config_hash,
+    contains_grader,
+    exact_match_grader,
+    run_evaluation,
+)
 from dotenv import load_dotenv
 import os
 
@@ -26,21 +34,27 @@ urls = [
     "https://lilianweng.github.io/posts/2023-10-25-adv-attack-llm/",
 ]
 
+CHUNK_SIZE = 250
+CHUNK_OVERLAP = 0
+RETRIEVER_K = 4
+
 docs = [WebBaseLoader(url).load() for url in urls]
 docs_list = [item for sublist in docs for item in sublist]
 
 text_splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
-    chunk_size=250, chunk_overlap=0
+    chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP
 )
 
 doc_splits = text_splitter.split_documents(docs_list)
 
-vectorstore = SKLearnVectorStore.from_documents(
-    documents=doc_splits,
+# BM25 candidates reranked by embedding similarity; new chunks can be added
+# later with `retriever.add_documents` without rebuilding the index
+retriever = HybridRetriever(
     # embedding=NomicEmbeddings(model="nomic-embed-text-v1.5", inference_mode="local"),
     embedding=OpenAIEmbeddings(api_key=openai_api_key),
+    k=RETRIEVER_K,
 )
-retriever = vectorstore.as_retriever(k=4)
+retriever.add_documents(doc_splits)
 
 prompt = PromptTemplate(
     template="""You are an assistant for question-answering tasks.
@@ -76,6 +90,19 @@ grading_prompt = PromptTemplate(
 
 retrieval_grader = grading_prompt | llm | JsonOutputParser()
 
+answer_grading_prompt = PromptTemplate(
+    template="""You are a teacher grading a quiz. \n
+    Here is the question: {question} \n
+    Here is the reference answer: \n\n {reference} \n\n
+    Here is the student answer: \n\n {prediction} \n\n
+    Grade the student answer as correct if it is factually consistent with the reference answer, even if it contains more information. \n
+    Give a binary score 'yes' or 'no' score to indicate whether the student answer is correct. \n
+    Provide the binary score as a JSON with a single key 'score' and no premable or explanation.""",
+    input_variables=["question", "reference", "prediction"],
+)
+
+answer_grader = answer_grading_prompt | llm | JsonOutputParser()
+
 # Define the graph state and logic
 class GraphState(Dict):
     question: str
@@ -174,12 +201,77 @@ custom_graph = workflow.compile()
 
 def predict_custom_agent_answer(example: Dict) -> Dict:
     config = {"configurable": {"thread_id": str(uuid.uuid4())}}
-    state_dict = custom_graph.invoke(
-        {"question": example["input"], "steps": []}, config
+    state_dict = {"question": example["input"], "steps": []}
+    step_latencies = []
+    # Stream node updates so each step in the trace can be timed
+    last = time.perf_counter()
+    for update in custom_graph.stream(state_dict, config, stream_mode="updates"):
+        now = time.perf_counter()
+        for node_state in update.values():
+            if not node_state:
+                continue
+            new_steps = node_state.get("steps", [])[len(step_latencies):]
+            for step in new_steps:
+                step_latencies.append({"step": step, "seconds": (now - last) / len(new_steps)})
+            state_dict.update(node_state)
+        last = now
+    return {
+        "response": state_dict["generation"],
+        "steps": state_dict["steps"],
+        "step_latencies": step_latencies,
+    }
+
+def llm_answer_grader(question: str, reference: str, prediction: str) -> float:
+    score = answer_grader.invoke(
+        {"question": question, "reference": reference, "prediction": prediction}
     )
-    return {"response": state_dict["generation"], "steps": state_dict["steps"]}
+    return 1.0 if score["score"] == "yes" else 0.0
+
+GRADERS = {
+    "llm": llm_answer_grader,
+    "exact_match": exact_match_grader,
+    "contains": contains_grader,
+}
+
+def grader_fingerprint(grader: str) -> str:
+    """Hash of what determines a grader's scores beyond its name."""
+    if grader == "llm":
+        return config_hash({
+            "prompt": answer_grading_prompt.template,
+            "llm": {"model": llm.model, "temperature": llm.temperature},
+        })
+    return ""
+
+def pipeline_config() -> Dict:
+    """Everything that affects the agent's answers; its hash keys the evaluation cache."""
+    return {
+        "urls": urls,
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+        "retriever": {
+            "type": "hybrid_bm25_rrf",
+            "k": RETRIEVER_K,
+            "candidates": retriever.candidates,
+            "rrf_k": retriever.rrf_k,
+        },
+        "llm": {"model": llm.model, "temperature": llm.temperature},
+        "rag_prompt": prompt.template,
+        "grading_prompt": grading_prompt.template,
+        "nodes": sorted(workflow.nodes),
+    }
 
-def evaluate_agent(examples: List[Dict]) -> Dict:
-    # Placeholder function to represent the evaluation process
-    # Implement as needed based on your specific evaluation logic
-    return {"evaluation": "Not yet implemented"}
+evaluation_cache = EvaluationCache()
+
+def evaluate_agent(examples: List[Dict], grader: str = "llm", concurrency: int = 4) -> Dict:
+    if grader not in GRADERS:
+        raise ValueError(f"Unknown grader '{grader}'. Available graders: {', '.join(GRADERS)}")
+    return run_evaluation(
+        examples,
+        predict_custom_agent_answer,
+        grader=GRADERS[grader],
+        grader_name=grader,
+        pipeline_hash=config_hash(pipeline_config()),
+        cache=evaluation_cache,
+        concurrency=concurrency,
+        grader_fingerprint=grader_fingerprint(grader),
+    )
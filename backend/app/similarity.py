@@ -0,0 +1,354 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import struct
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Set
+
+import numpy as np
+
+# SQLite file holding the LSH index; set to an empty string to disable reuse
+SIMILARITY_INDEX_PATH = os.getenv("SIMILARITY_INDEX_PATH", "./cache/similarity.db")
+# Replace identifiers and literals with placeholders before fingerprinting, so
+# renamed copies match. Matches are then only used as edit prompts, since the
+# prior output would mention the wrong names.
+SIMILARITY_ABSTRACT_IDENTIFIERS = os.getenv("SIMILARITY_ABSTRACT_IDENTIFIERS", "0") == "1"
+# Estimated Jaccard similarity at or above which a prior output is returned as is
+REUSE_THRESHOLD = float(os.getenv("SIMILARITY_REUSE_THRESHOLD", "0.95"))
+# ... and at or above which it is used as the basis of an edit-style prompt
+EDIT_THRESHOLD = float(os.getenv("SIMILARITY_EDIT_THRESHOLD", "0.8"))
+
+NUM_PERM = 128
+BANDS = 16  # 16 bands of 8 rows: candidates are likely from about 0.7 similarity
+SHINGLE_SIZE = 5
+SEED = 1
+# Units read per band bucket, newest first. Near-duplicate families share
+# buckets, so without a cap a lookup would compare the whole family.
+BUCKET_LIMIT = 16
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+
+# Bumped when tokenization changes, so stored signatures are rebuilt
+TOKENIZER_VERSION = 2
+
+# String literals are matched before comments so that "//" or "#" inside a
+# string is kept. "#" only starts a comment when it is not a C preprocessor
+# directive or a JavaScript private member (`this.#field`).
+TOKEN_RE = re.compile(r"""
+    (?P<string>
+        "{3}[\s\S]*?"{3} | '{3}[\s\S]*?'{3}
+      | "(?:\\.|[^"\\\n])*" | '(?:\\.|[^'\\\n])*' | `(?:\\.|[^`\\])*`
+    )
+  | (?P<comment>
+        /\*[\s\S]*?\*/ | //[^\n]*
+      | (?<![.\w$])\#(?!\s*(?:include|define|undef|ifn?def|if|elif|else|endif|pragma|error|warning|line)\b)[^\n]*
+    )
+  | [A-Za-z_]\w* | \d+(?:\.\d+)? | \S
+""", re.X)
+
+# Tokens that end a unit's defining header (`def f(...):`, `function f(...) {`)
+HEADER_END = frozenset(":{;")
+
+# Keywords of the languages the analyzer supports, kept when identifiers are abstracted
+KEYWORDS = frozenset("""
+    and as assert async await break case catch class const continue def default del do elif else
+    end except export extends false final finally fn for from function if implements import in
+    instanceof interface is lambda let local module new nil none not null or pass private protected
+    public raise repeat require rescue return self static struct super switch this throw throws true
+    try typeof unless until var void while with yield
+""".split())
+
+
+def normalize_tokens(code: str, abstract_identifiers: bool = SIMILARITY_ABSTRACT_IDENTIFIERS) -> List[str]:
+    """Tokenize code with comments removed, optionally abstracting names and literals."""
+    tokens = [m.group() for m in TOKEN_RE.finditer(code) if m.lastgroup != "comment"]
+    if not abstract_identifiers:
+        return tokens
+    normalized = []
+    for token in tokens:
+        if token[0] in "\"'`":
+            normalized.append("STR")
+        elif token[0].isdigit():
+            normalized.append("NUM")
+        elif token[0].isalpha() or token[0] == "_":
+            normalized.append(token if token.lower() in KEYWORDS else "ID")
+        else:
+            normalized.append(token)
+    return normalized
+
+
+def definition_header(tokens: List[str]) -> str:
+    """The tokens naming a unit and its signature, up to the body's opening `:`, `{` or `;`.
+
+    Units without such a delimiter use all their tokens.
+    """
+    depth = 0
+    for i, token in enumerate(tokens):
+        if token in ("(", "[") or token == "{" and depth:
+            depth += 1
+        elif token in (")", "]", "}") and depth:
+            depth -= 1
+        elif depth == 0 and token in HEADER_END:
+            return "\x1f".join(tokens[:i + 1])
+    return "\x1f".join(tokens)
+
+
+class MinHasher:
+    """MinHash signatures over token shingles using universal hashing mod a Mersenne prime."""
+
+    def __init__(self, num_perm: int = NUM_PERM, shingle_size: int = SHINGLE_SIZE, seed: int = SEED):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.RandomState(seed)
+        # a, h < 2**32 and b < 2**61, so a * h + b cannot overflow uint64
+        self._a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, 1 << 61, size=num_perm, dtype=np.uint64)
+
+    def signature(self, tokens: List[str]) -> Optional[np.ndarray]:
+        if not tokens:
+            return None
+        size = min(self.shingle_size, len(tokens))
+        shingles = {"\x1f".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+        hashes = np.fromiter(
+            (struct.unpack("<I", hashlib.blake2b(s.encode(), digest_size=4).digest())[0] for s in shingles),
+            dtype=np.uint64, count=len(shingles),
+        )
+        permuted = ((self._a[:, None] * hashes[None, :] + self._b[:, None]) % MERSENNE_PRIME) & MAX_HASH
+        return permuted.min(axis=1).astype(np.uint32)
+
+
+@dataclass
+class Match:
+    unit_id: int
+    similarity: float
+    code: str
+    output: str
+    header: str
+
+
+class SimilarityIndex:
+    """Persistent MinHash LSH index of code units and their generated outputs.
+
+    Each signature is split into `BANDS` bands; units sharing any band bucket
+    are candidates, and the best candidate is chosen by estimated Jaccard
+    similarity. Buckets live in an indexed SQLite table, so a lookup is a
+    handful of index probes regardless of how many units are stored, and
+    all server workers share the index.
+    """
+
+    def __init__(self, path: str, abstract_identifiers: bool = SIMILARITY_ABSTRACT_IDENTIFIERS):
+        self.path = path
+        self.abstract_identifiers = abstract_identifiers
+        self.hasher = MinHasher()
+        self.rows = NUM_PERM // BANDS
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            # Signatures are only comparable under the same tokenizer and hashing parameters
+            params = json.dumps({
+                "num_perm": NUM_PERM, "bands": BANDS, "shingle_size": SHINGLE_SIZE,
+                "seed": SEED, "abstract_identifiers": abstract_identifiers,
+                "tokenizer": TOKENIZER_VERSION,
+            }, sort_keys=True)
+            row = conn.execute("SELECT value FROM meta WHERE key = 'params'").fetchone()
+            if row and row[0] != params:
+                logging.info("Similarity index parameters changed; clearing the index")
+                conn.execute("DROP TABLE IF EXISTS units")
+                conn.execute("DROP TABLE IF EXISTS bands")
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('params', ?)", (params,))
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS units (
+                    id INTEGER PRIMARY KEY, namespace TEXT NOT NULL, signature BLOB NOT NULL,
+                    code TEXT NOT NULL, output TEXT NOT NULL, header TEXT NOT NULL);
+                CREATE TABLE IF NOT EXISTS bands (
+                    namespace TEXT NOT NULL, band INTEGER NOT NULL, bucket INTEGER NOT NULL,
+                    unit_id INTEGER NOT NULL);
+                CREATE INDEX IF NOT EXISTS bands_lookup ON bands (namespace, band, bucket, unit_id);
+                CREATE TABLE IF NOT EXISTS stats (
+                    namespace TEXT NOT NULL, outcome TEXT NOT NULL, count INTEGER NOT NULL,
+                    PRIMARY KEY (namespace, outcome));
+            """)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def fingerprint(self, code: str) -> Optional[np.ndarray]:
+        return self.hasher.signature(normalize_tokens(code, self.abstract_identifiers))
+
+    def _buckets(self, signature: np.ndarray) -> List[int]:
+        """One signed 64-bit bucket id per band."""
+        buckets = []
+        for band in range(BANDS):
+            chunk = signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            buckets.append(int.from_bytes(hashlib.blake2b(chunk, digest_size=8).digest(), "little", signed=True))
+        return buckets
+
+    def candidates(self, namespace: str, signature: np.ndarray) -> Set[int]:
+        """Ids of units sharing a band bucket, at most `BUCKET_LIMIT` per band."""
+        conn = self._connect()
+        candidate_ids = set()
+        # One covering-index probe per band
+        for band, bucket in enumerate(self._buckets(signature)):
+            candidate_ids.update(row[0] for row in conn.execute(
+                "SELECT unit_id FROM bands WHERE namespace = ? AND band = ? AND bucket = ? "
+                "ORDER BY unit_id DESC LIMIT ?",
+                (namespace, band, bucket, BUCKET_LIMIT),
+            ))
+        return candidate_ids
+
+    def query(self, namespace: str, signature: np.ndarray) -> Optional[Match]:
+        """Return the most similar stored unit among the bucket candidates."""
+        candidate_ids = self.candidates(namespace, signature)
+        if not candidate_ids:
+            return None
+        conn = self._connect()
+
+        placeholders = ",".join("?" for _ in candidate_ids)
+        rows = conn.execute(
+            f"SELECT id, signature FROM units WHERE id IN ({placeholders})", list(candidate_ids)
+        ).fetchall()
+        signatures = np.stack([np.frombuffer(blob, dtype=np.uint32) for _, blob in rows])
+        similarities = (signatures == signature).mean(axis=1)
+        best = int(similarities.argmax())
+        unit_id = rows[best][0]
+        code, output, header = conn.execute(
+            "SELECT code, output, header FROM units WHERE id = ?", (unit_id,)
+        ).fetchone()
+        return Match(unit_id=unit_id, similarity=float(similarities[best]), code=code, output=output, header=header)
+
+    def add(self, namespace: str, signature: np.ndarray, code: str, output: str, header: str) -> int:
+        with self._connect() as conn:
+            unit_id = conn.execute(
+                "INSERT INTO units (namespace, signature, code, output, header) VALUES (?, ?, ?, ?, ?)",
+                (namespace, signature.tobytes(), code, output, header),
+            ).lastrowid
+            conn.executemany(
+                "INSERT INTO bands (namespace, band, bucket, unit_id) VALUES (?, ?, ?, ?)",
+                [(namespace, band, bucket, unit_id) for band, bucket in enumerate(self._buckets(signature))],
+            )
+        return unit_id
+
+    def record(self, namespace: str, outcome: str):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO stats (namespace, outcome, count) VALUES (?, ?, 1) "
+                "ON CONFLICT (namespace, outcome) DO UPDATE SET count = count + 1",
+                (namespace, outcome),
+            )
+
+    def stats(self) -> Dict[str, Dict]:
+        """Per-namespace outcome counts and savings rates.
+
+        `reuse_rate` is the share of units answered without any LLM call;
+        `savings_rate` also counts units generated from a cheaper edit prompt.
+        """
+        conn = self._connect()
+        summary: Dict[str, Dict] = {}
+        for namespace, outcome, count in conn.execute("SELECT namespace, outcome, count FROM stats"):
+            summary.setdefault(namespace, {"reused": 0, "edited": 0, "generated": 0})[outcome] = count
+        for namespace, counts in summary.items():
+            total = counts["reused"] + counts["edited"] + counts["generated"]
+            (indexed,) = conn.execute("SELECT COUNT(*) FROM units WHERE namespace = ?", (namespace,)).fetchone()
+            counts.update({
+                "lookups": total,
+                "indexed_units": indexed,
+                "reuse_rate": counts["reused"] / total if total else 0.0,
+                "edit_rate": counts["edited"] / total if total else 0.0,
+                "savings_rate": (counts["reused"] + counts["edited"]) / total if total else 0.0,
+            })
+        return summary
+
+
+def generate_with_reuse(
+    index: Optional[SimilarityIndex],
+    namespace: str,
+    code: str,
+    generate: Callable[[], str],
+    edit: Callable[[Match], str],
+) -> str:
+    """Produce output for `code`, reusing or editing a near-duplicate's output when possible.
+
+    A prior output is only returned as is when the match also has the same
+    defining header (name and signature); a renamed copy goes through the
+    edit prompt instead, since the prior output would describe the wrong name.
+    """
+    if index is None:
+        return generate()
+    header = definition_header(normalize_tokens(code, abstract_identifiers=False))
+    try:
+        signature = index.fingerprint(code)
+        match = index.query(namespace, signature) if signature is not None else None
+    except sqlite3.Error as e:
+        logging.warning(f"Similarity lookup failed: {e}")
+        return generate()
+
+    if (match and match.similarity >= REUSE_THRESHOLD and match.header == header
+            and not index.abstract_identifiers):
+        outcome, output = "reused", match.output
+    elif match and match.similarity >= EDIT_THRESHOLD:
+        outcome, output = "edited", edit(match)
+    else:
+        outcome, output = "generated", generate()
+
+    # An edit of a unit with the same header adds nothing the index can't
+    # already match, and would only grow that unit's buckets
+    indexed = outcome == "generated" or (outcome == "edited" and match.header != header)
+    try:
+        if indexed and signature is not None:
+            index.add(namespace, signature, code, output, header)
+        index.record(namespace, outcome)
+    except sqlite3.Error as e:
+        logging.warning(f"Similarity index update failed: {e}")
+    return output
+
+
+def open_similarity_index(path: str) -> Optional[SimilarityIndex]:
+    """Open the index at `path`, recreating a corrupt file; None if it cannot be used."""
+    try:
+        try:
+            return SimilarityIndex(path)
+        except sqlite3.DatabaseError as e:
+            # OperationalError (e.g. locked by another worker) does not mean corruption
+            if isinstance(e, sqlite3.OperationalError):
+                raise
+            logging.warning(f"Similarity index at {path} is unreadable ({e}); recreating it")
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+            return SimilarityIndex(path)
+    except (OSError, sqlite3.Error) as e:
+        logging.warning(f"Similarity index at {path} is unavailable, generating without reuse: {e}")
+        return None
+
+
+_similarity_index = None
+_similarity_index_opened = False
+_similarity_index_lock = threading.Lock()
+
+
+def get_similarity_index() -> Optional[SimilarityIndex]:
+    """Return the shared similarity index, or None when reuse is disabled or unavailable."""
+    global _similarity_index, _similarity_index_opened
+    if not SIMILARITY_INDEX_PATH:
+        return None
+    with _similarity_index_lock:
+        if not _similarity_index_opened:
+            # Only tried once per process, so a bad path doesn't cost every request
+            _similarity_index = open_similarity_index(SIMILARITY_INDEX_PATH)
+            _similarity_index_opened = True
+    return _similarity_index
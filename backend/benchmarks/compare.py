@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Compare two benchmark reports produced by `run.py`.
+
+    python -m benchmarks.compare baseline.json candidate.json
+"""
+import argparse
+import json
+import sys
+
+METRICS = (
+    ("requests_per_sec", "req/s", True),
+    ("p50", "p50 ms", False),
+    ("p95", "p95 ms", False),
+    ("p99", "p99 ms", False),
+)
+
+
+def metric(result: dict, name: str) -> float:
+    if name in result["latency_ms"]:
+        return result["latency_ms"][name]
+    return result[name]
+
+
+def change(old: float, new: float, higher_is_better: bool) -> str:
+    if not old:
+        return "n/a"
+    pct = (new - old) / old * 100.0
+    better = pct > 0 if higher_is_better else pct < 0
+    return f"{pct:+.1f}%{'' if abs(pct) < 1 else (' better' if better else ' worse')}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark JSON reports.")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as f:
+        base = json.load(f)
+    with open(args.candidate) as f:
+        cand = json.load(f)
+
+    print(f"baseline:  {base.get('commit')}")
+    print(f"candidate: {cand.get('commit')}")
+    for path, new in cand["endpoints"].items():
+        old = base["endpoints"].get(path)
+        if old is None:
+            continue
+        print(f"\n{path}")
+        for name, label, higher_is_better in METRICS:
+            a, b = metric(old, name), metric(new, name)
+            print(f"  {label:<8} {a:>10.2f} -> {b:>10.2f}  {change(a, b, higher_is_better)}")
+
+    a, b = base.get("peak_rss_mb"), cand.get("peak_rss_mb")
+    if a and b:
+        print(f"\npeak RSS  {a:>10.1f} -> {b:>10.1f} MiB  {change(a, b, False)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
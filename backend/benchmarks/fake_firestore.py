@@ -0,0 +1,62 @@
+"""In-memory stand-in for the parts of the Firestore client used by the backend.
+
+`fetch_and_list_doc_types` only needs `client.collection(name).stream()` and
+snapshots exposing `id` and `to_dict()`, so that is all this implements.
+"""
+import copy
+import random
+from typing import Dict, List
+
+
+class FakeDocumentSnapshot:
+    def __init__(self, doc_id: str, data: Dict):
+        self.id = doc_id
+        self._data = data
+
+    def to_dict(self) -> Dict:
+        # Firestore hands out a fresh dict per snapshot
+        return copy.deepcopy(self._data)
+
+
+class FakeCollection:
+    def __init__(self, documents: Dict[str, Dict]):
+        self._documents = documents
+
+    def stream(self):
+        for doc_id, data in self._documents.items():
+            yield FakeDocumentSnapshot(doc_id, data)
+
+
+class FakeFirestore:
+    def __init__(self, collections: Dict[str, Dict[str, Dict]] = None):
+        self._collections = collections or {}
+
+    def collection(self, name: str) -> FakeCollection:
+        return FakeCollection(self._collections.get(name, {}))
+
+
+def generate_documents(count: int, variants: int = 5, seed: int = 0) -> Dict[str, Dict]:
+    """Build `count` documents spread over `variants` nested schemas."""
+    rng = random.Random(seed)
+    schemas: List[Dict] = []
+    for v in range(variants):
+        schema = {
+            "name": "",
+            "created_at": 0,
+            "profile": {"email": "", "age": 0, "address": {"city": "", "zip": ""}},
+            "tags": [{"label": "", "weight": 0.0}],
+        }
+        # Each variant adds a few distinct fields so documents group into `variants` types
+        for i in range(v):
+            schema[f"extra_{i}"] = {"value": i}
+        schemas.append(schema)
+
+    documents = {}
+    for n in range(count):
+        data = copy.deepcopy(schemas[n % variants])
+        data["name"] = f"user-{n}"
+        data["created_at"] = rng.randint(0, 2 ** 31)
+        data["profile"]["age"] = rng.randint(18, 90)
+        data["tags"] = [{"label": f"t{rng.randint(0, 9)}", "weight": rng.random()} for _ in range(3)]
+        documents[f"doc-{n:06d}"] = data
+    return documents
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""Offline throughput/latency benchmark for the FastAPI backend.
+
+Boots the stub Ollama server and the app (see `serve.py`) as subprocesses,
+drives each endpoint at a fixed concurrency and reports latency percentiles,
+requests/sec and the server's peak RSS as JSON.
+
+    cd backend
+    python -m benchmarks.run --concurrency 8 --requests 200 --output bench.json
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+
+SAMPLE_CODE = '''def merge_intervals(intervals):
+    """Merge overlapping intervals."""
+    intervals.sort(key=lambda x: x[0])
+    merged = []
+    for start, end in intervals:
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+'''
+
+ENDPOINTS = {
+    "/generate-docs": {"function_code": SAMPLE_CODE},
+    "/generate-unit-test": {"function_code": SAMPLE_CODE},
+    "/get-embeddings": {"text": SAMPLE_CODE},
+    "/check-models": {"models": ["llama3:8b", "nomic-embed-text"]},
+    "/compare-documents": {
+        "collection_name": "bench",
+        "service_account": {"type": "service_account", "project_id": "bench"},
+    },
+}
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until_ready(port: int, process: subprocess.Popen, timeout: float = 60.0):
+    """Poll `GET /` until the server answers or the process exits."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Process exited early with code {process.returncode}")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/")
+            conn.getresponse().read()
+            conn.close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Server on port {port} did not become ready within {timeout}s")
+
+
+def process_tree(pid: int):
+    """`pid` and all its descendants (Linux `/proc`)."""
+    pids = [pid]
+    for current in pids:
+        try:
+            with open(f"/proc/{current}/task/{current}/children") as f:
+                pids.extend(int(child) for child in f.read().split())
+        except OSError:
+            pass
+    return pids
+
+
+def peak_rss_mb(pid: int):
+    """Summed peak resident set size of `pid` and its workers in MiB (Linux `VmHWM`)."""
+    total_kb = None
+    for current in process_tree(pid):
+        try:
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        total_kb = (total_kb or 0) + int(line.split()[1])
+                        break
+        except OSError:
+            pass
+    return total_kb / 1024.0 if total_kb is not None else None
+
+
+def percentile(sorted_values, pct: float) -> float:
+    """Linearly interpolated percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def make_payload(path: str, n: int, repeat: bool) -> str:
+    """Request body for the `n`-th request to `path`.
+
+    Generation and embedding payloads get a unique suffix unless `repeat` is
+    set, so the response cache does not turn the run into a cache benchmark.
+    """
+    payload = dict(ENDPOINTS[path])
+    if not repeat:
+        for field in ("function_code", "text"):
+            if field in payload:
+                payload[field] = f"{payload[field]}# request {n}\n"
+    return json.dumps(payload)
+
+
+def run_load(port: int, path: str, total: int, concurrency: int, repeat: bool = False, offset: int = 0) -> dict:
+    """Send `total` POST requests to `path` from `concurrency` keep-alive clients."""
+    headers = {"Content-Type": "application/json"}
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    remaining = [total]
+
+    def worker():
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=300)
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    break
+                remaining[0] -= 1
+                n = offset + remaining[0]
+            body = make_payload(path, n, repeat)
+            start = time.perf_counter()
+            try:
+                conn.request("POST", path, body=body, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                elapsed = time.perf_counter() - start
+                with lock:
+                    latencies.append(elapsed)
+                    if response.status >= 400:
+                        errors.append(response.status)
+            except (OSError, http.client.HTTPException) as e:
+                with lock:
+                    errors.append(type(e).__name__)
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=300)
+        conn.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    duration = time.perf_counter() - started
+
+    latencies.sort()
+    ms = [v * 1000.0 for v in latencies]
+    return {
+        "requests": total,
+        "errors": len(errors),
+        "error_codes": sorted({str(e) for e in errors}),
+        "concurrency": concurrency,
+        "duration_s": round(duration, 4),
+        "requests_per_sec": round(total / duration, 2) if duration else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(ms, 50), 3),
+            "p95": round(percentile(ms, 95), 3),
+            "p99": round(percentile(ms, 99), 3),
+            "mean": round(statistics.fmean(ms), 3) if ms else 0.0,
+            "max": round(ms[-1], 3) if ms else 0.0,
+        },
+    }
+
+
+def git_commit():
+    try:
+        result = subprocess.run(["git", "rev-parse", "HEAD"], cwd=BACKEND_DIR,
+                                capture_output=True, text=True, timeout=10)
+        return result.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def terminate(process: subprocess.Popen):
+    if process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the backend against a stub Ollama server.")
+    parser.add_argument("--endpoints", nargs="+", choices=sorted(ENDPOINTS), default=list(ENDPOINTS),
+                        help="Endpoints to benchmark (default: all)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=1, help="Server worker processes")
+    parser.add_argument("--repeat-payloads", action="store_true",
+                        help="Send identical payloads so generation/embedding requests hit the response cache")
+    parser.add_argument("--similarity", action="store_true",
+                        help="Enable near-duplicate reuse on the server (payloads differ only in a comment, so most are reused)")
+    parser.add_argument("--requests", type=int, default=200, help="Measured requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=10, help="Unmeasured requests per endpoint")
+    parser.add_argument("--token-latency", type=float, default=5.0,
+                        help="Stub delay between tokens in milliseconds")
+    parser.add_argument("--first-token-latency", type=float, default=20.0,
+                        help="Stub delay before the first token in milliseconds")
+    parser.add_argument("--tokens", type=int, default=32, help="Stub tokens per completion")
+    parser.add_argument("--embedding-dim", type=int, default=4096)
+    parser.add_argument("--firestore-docs", type=int, default=500)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    stub_port = free_port()
+    app_port = free_port()
+
+    stub = subprocess.Popen([
+        sys.executable, os.path.join(BENCH_DIR, "stub_ollama.py"), "serve",
+        "--port", str(stub_port),
+        "--token-latency", str(args.token_latency),
+        "--first-token-latency", str(args.first_token_latency),
+        "--tokens", str(args.tokens),
+        "--embedding-dim", str(args.embedding_dim),
+    ], stdout=subprocess.DEVNULL)
+
+    env = os.environ.copy()
+    env["OLLAMA_BASE_URL"] = f"http://127.0.0.1:{stub_port}"
+    server = None
+    try:
+        wait_until_ready(stub_port, stub)
+        server = subprocess.Popen([
+            sys.executable, os.path.join(BENCH_DIR, "serve.py"),
+            "--port", str(app_port),
+            "--workers", str(args.workers),
+            "--firestore-docs", str(args.firestore_docs),
+        ] + (["--similarity"] if args.similarity else []), cwd=BACKEND_DIR, env=env)
+        wait_until_ready(app_port, server)
+
+        results = {}
+        for path in args.endpoints:
+            if args.warmup:
+                run_load(app_port, path, args.warmup, min(args.concurrency, args.warmup),
+                         args.repeat_payloads, offset=args.requests)
+            results[path] = run_load(app_port, path, args.requests, args.concurrency, args.repeat_payloads)
+            print(f"{path}: {results[path]['requests_per_sec']} req/s, "
+                  f"p50 {results[path]['latency_ms']['p50']} ms, "
+                  f"p99 {results[path]['latency_ms']['p99']} ms, "
+                  f"{results[path]['errors']} errors", file=sys.stderr)
+
+        report = {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "config": {k: v for k, v in vars(args).items() if k != "output"},
+            "peak_rss_mb": peak_rss_mb(server.pid),
+            "endpoints": results,
+        }
+    finally:
+        if server is not None:
+            terminate(server)
+        terminate(stub)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
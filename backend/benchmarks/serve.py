@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Run the FastAPI app for benchmarking, wired to offline stand-ins.
+
+- LLM and embedding calls go to the stub Ollama server at `OLLAMA_BASE_URL`.
+- The `ollama` CLI (used by `/check-models`) is replaced by `stub_ollama.py`.
+- Firestore is replaced by an in-memory `FakeFirestore`.
+- The lifespan hook does not spawn a real Ollama process.
+- The response cache starts empty in a temporary directory.
+- Near-duplicate reuse is off unless `--similarity` is given, since the
+  runner's per-request payload variations would otherwise all be reused.
+
+The app is built by `create_app`, which uvicorn calls in every worker, so
+settings are passed to workers through environment variables.
+"""
+import argparse
+import os
+import stat
+import sys
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+import uvicorn
+from firebase_admin import credentials, firestore
+from google.auth.credentials import AnonymousCredentials
+
+from benchmarks.fake_firestore import FakeFirestore, generate_documents
+from benchmarks.stub_ollama import render_list
+
+BENCH_COLLECTION = "bench"
+
+
+class FakeCredential(credentials.Base):
+    """Credential accepted by `firebase_admin.initialize_app` without a real key."""
+
+    def __init__(self, service_account=None):
+        pass
+
+    def get_credential(self):
+        return AnonymousCredentials()
+
+
+def write_stub_cli(directory: str) -> str:
+    """Write an executable `ollama` wrapper.
+
+    `list` is answered from pre-rendered output by the shell itself, since
+    `/check-models` calls it on every request and starting a Python
+    interpreter each time would dominate that endpoint's latency. Other
+    subcommands dispatch to `stub_ollama.py`.
+    """
+    path = os.path.join(directory, "ollama")
+    with open(path, "w") as f:
+        f.write("#!/bin/sh\n")
+        f.write('if [ "$1" = "list" ]; then\n')
+        f.write("cat <<'EOF'\n")
+        f.write(render_list())
+        f.write("EOF\n")
+        f.write("exit 0\n")
+        f.write("fi\n")
+        f.write(f'exec "{sys.executable}" "{os.path.join(BENCH_DIR, "stub_ollama.py")}" "$@"\n')
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return path
+
+
+def create_app():
+    """Import the app and swap external dependencies for offline stand-ins."""
+    from app import main
+
+    main.OLLAMA_BINARY_PATH = os.environ["BENCH_OLLAMA_BINARY"]
+
+    documents = generate_documents(int(os.environ.get("BENCH_FIRESTORE_DOCS", "500")))
+    fake_db = FakeFirestore({BENCH_COLLECTION: documents})
+    # `compare_documents` imports these modules lazily, so patch them in place
+    credentials.Certificate = FakeCredential
+    firestore.client = lambda app=None: fake_db
+    return main.app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the backend against offline stubs.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--firestore-docs", type=int, default=500,
+                        help="Number of documents in the fake Firestore collection")
+    parser.add_argument("--similarity", action="store_true",
+                        help="Enable near-duplicate reuse with an empty similarity index")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="bench-ollama-") as stub_dir:
+        # Must be set before `app.main` is imported, here and in the workers
+        os.environ["OLLAMA_SUPERVISED"] = "1"
+        os.environ["RESPONSE_CACHE_PATH"] = os.path.join(stub_dir, "responses.db")
+        os.environ["SIMILARITY_INDEX_PATH"] = os.path.join(stub_dir, "similarity.db") if args.similarity else ""
+        os.environ["BENCH_OLLAMA_BINARY"] = write_stub_cli(stub_dir)
+        os.environ["BENCH_FIRESTORE_DOCS"] = str(args.firestore_docs)
+        os.environ["PYTHONPATH"] = os.pathsep.join(filter(None, [BACKEND_DIR, os.environ.get("PYTHONPATH")]))
+
+        uvicorn.run("benchmarks.serve:create_app", factory=True, host=args.host, port=args.port,
+                    workers=args.workers, log_level="warning")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""Cold-start report for the backend.
+
+`importtime` summarizes `python -X importtime -c "import app.main"` and, with
+`--check`, exits non-zero when the import exceeds the time budget or eagerly
+imports a module that should only load on first use.
+
+`first-response` measures time from process spawn to the first successful
+`GET /`, either for `server.py` (dev) or a PyInstaller bundle (`--cmd dist/server`).
+
+    cd backend
+    python -m benchmarks.startup importtime --check
+    python -m benchmarks.startup first-response --runs 5
+"""
+import argparse
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+
+# Import budget for `app.main` in milliseconds
+DEFAULT_BUDGET_MS = 1000.0
+
+# Heavy packages that must only be imported on first use
+LAZY_MODULES = (
+    "firebase_admin",
+    "langchain",
+    "langchain_core",
+    "langchain_community",
+    "langchain_ollama",
+    "numpy",
+    "psutil",
+)
+
+
+def parse_importtime(stderr: str):
+    """Parse `-X importtime` output into (module, self_us, cumulative_us, depth) tuples."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            module = name.rstrip()
+            stripped = module.lstrip()
+            depth = (len(module) - len(stripped)) // 2
+            entries.append((stripped, int(self_us), int(cumulative_us), depth))
+        except ValueError:
+            continue
+    return entries
+
+
+def importtime_report(module: str, top: int) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+    entries = parse_importtime(result.stderr)
+    imported = {name for name, _, _, _ in entries}
+    total_us = next((cum for name, _, cum, _ in entries if name == module), None)
+    if total_us is None:
+        total_us = sum(cum for _, _, cum, depth in entries if depth == 0)
+
+    # Aggregate by top-level package so e.g. all of pydantic shows up as one line
+    by_package = {}
+    for name, self_us, _, _ in entries:
+        package = name.split(".")[0]
+        by_package[package] = by_package.get(package, 0) + self_us
+    slowest = sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top]
+
+    return {
+        "module": module,
+        "total_ms": round(total_us / 1000.0, 3),
+        "modules_imported": len(entries),
+        "slowest_packages_ms": {name: round(us / 1000.0, 3) for name, us in slowest},
+        "eager_heavy_imports": sorted(m for m in LAZY_MODULES if m in imported),
+    }
+
+
+def wait_for_root(port: int, process: subprocess.Popen, timeout: float) -> float:
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited early with code {process.returncode}")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/")
+            status = conn.getresponse().status
+            conn.close()
+            if status == 200:
+                return time.perf_counter() - started
+        except OSError:
+            pass
+        time.sleep(0.01)
+    raise RuntimeError(f"No response on port {port} within {timeout}s")
+
+
+def first_response_report(cmd, port: int, runs: int, timeout: float) -> dict:
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        process = subprocess.Popen(cmd, cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_for_root(port, process, timeout)
+            timings.append(time.perf_counter() - started)
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+    ms = sorted(t * 1000.0 for t in timings)
+    return {
+        "command": cmd,
+        "runs": runs,
+        "min_ms": round(ms[0], 3),
+        "median_ms": round(statistics.median(ms), 3),
+        "max_ms": round(ms[-1], 3),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure backend cold start.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    imp = sub.add_parser("importtime", help="Summarize -X importtime for the app")
+    imp.add_argument("--module", default="app.main")
+    imp.add_argument("--top", type=int, default=15, help="Number of slowest packages to list")
+    imp.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    imp.add_argument("--check", action="store_true",
+                     help="Exit non-zero if over budget or heavy modules load eagerly")
+
+    first = sub.add_parser("first-response", help="Time from spawn to the first GET / response")
+    first.add_argument("--cmd", nargs="+", default=[sys.executable, "server.py"],
+                       help="Server command, e.g. dist/server for the PyInstaller bundle")
+    first.add_argument("--port", type=int, default=8001)
+    first.add_argument("--runs", type=int, default=5)
+    first.add_argument("--timeout", type=float, default=120.0)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "importtime":
+        report = importtime_report(args.module, args.top)
+        report["budget_ms"] = args.budget_ms
+        print(json.dumps(report, indent=2))
+        if args.check:
+            failures = []
+            if report["total_ms"] > args.budget_ms:
+                failures.append(f"import took {report['total_ms']} ms, budget is {args.budget_ms} ms")
+            if report["eager_heavy_imports"]:
+                failures.append(f"eagerly imported: {', '.join(report['eager_heavy_imports'])}")
+            for failure in failures:
+                print(f"FAIL: {failure}", file=sys.stderr)
+            return 1 if failures else 0
+    else:
+        print(json.dumps(first_response_report(args.cmd, args.port, args.runs, args.timeout), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""Stand-in for the `ollama` binary used by the benchmark suite.
+
+`serve` starts an HTTP server speaking the subset of the Ollama API the
+backend uses (chat/generate streaming, embeddings, tags) with a configurable
+per-token latency. `list` and `pull` mimic the CLI subcommands called by
+`/check-models` and `/install-models`. Only the standard library is used so
+the stub runs anywhere the backend does, without network access.
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_MODELS = "llama3:8b"
+
+WORDS = (
+    "the function returns a value computed from its arguments and raises an "
+    "error when the input is invalid it is used by the caller to process data"
+).split()
+
+
+def installed_models():
+    """Models reported by `list` and `/api/tags`."""
+    models = os.getenv("STUB_OLLAMA_MODELS", DEFAULT_MODELS)
+    return [m.strip() for m in models.split(",") if m.strip()]
+
+
+def fake_embedding(text, dim):
+    """Deterministic unit-length embedding derived from the text."""
+    seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "big")
+    rng = random.Random(seed)
+    vec = [rng.uniform(-1.0, 1.0) for _ in range(dim)]
+    norm = sum(v * v for v in vec) ** 0.5 or 1.0
+    return [v / norm for v in vec]
+
+
+def now_iso():
+    return datetime.now(timezone.utc).isoformat()
+
+
+class StubOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    # Set by `serve()`
+    token_latency = 0.0
+    first_token_latency = 0.0
+    num_tokens = 32
+    embedding_dim = 4096
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        return json.loads(body or b"{}")
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, payload):
+        data = (json.dumps(payload) + "\n").encode()
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _tokens(self):
+        time.sleep(self.first_token_latency)
+        for i in range(self.num_tokens):
+            if i:
+                time.sleep(self.token_latency)
+            yield WORDS[i % len(WORDS)] + " "
+
+    def _stream_completion(self, model, key, stream):
+        """Emit tokens either as NDJSON chunks or as one aggregated reply."""
+        started = time.perf_counter_ns()
+
+        def wrap(text):
+            if key == "message":
+                return {"message": {"role": "assistant", "content": text}}
+            return {"response": text}
+
+        def final():
+            return {
+                "model": model,
+                "created_at": now_iso(),
+                "done": True,
+                "done_reason": "stop",
+                "total_duration": time.perf_counter_ns() - started,
+                "prompt_eval_count": 1,
+                "eval_count": self.num_tokens,
+            }
+
+        if not stream:
+            text = "".join(self._tokens())
+            self._send_json({**final(), **wrap(text)})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for token in self._tokens():
+            self._write_chunk({"model": model, "created_at": now_iso(), "done": False, **wrap(token)})
+        self._write_chunk({**final(), **wrap("")})
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path == "/":
+            body = b"Ollama is running"
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif self.path == "/api/tags":
+            self._send_json({"models": [
+                {"name": m, "model": m, "modified_at": now_iso(), "size": 0, "digest": ""}
+                for m in installed_models()
+            ]})
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        try:
+            payload = self._read_json()
+        except ValueError:
+            self._send_json({"error": "invalid JSON"}, status=400)
+            return
+        model = payload.get("model", "")
+
+        if self.path == "/api/chat":
+            self._stream_completion(model, "message", payload.get("stream", True))
+        elif self.path == "/api/generate":
+            self._stream_completion(model, "response", payload.get("stream", True))
+        elif self.path == "/api/embeddings":
+            self._send_json({"embedding": fake_embedding(payload.get("prompt", ""), self.embedding_dim)})
+        elif self.path == "/api/embed":
+            inputs = payload.get("input", "")
+            if isinstance(inputs, str):
+                inputs = [inputs]
+            self._send_json({
+                "model": model,
+                "embeddings": [fake_embedding(text, self.embedding_dim) for text in inputs],
+            })
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+
+def serve(args):
+    """Run the stub HTTP API until interrupted."""
+    StubOllamaHandler.token_latency = args.token_latency / 1000.0
+    StubOllamaHandler.first_token_latency = args.first_token_latency / 1000.0
+    StubOllamaHandler.num_tokens = args.tokens
+    StubOllamaHandler.embedding_dim = args.embedding_dim
+
+    server = ThreadingHTTPServer((args.host, args.port), StubOllamaHandler)
+    server.daemon_threads = True
+    print(f"Stub Ollama listening on http://{args.host}:{server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def render_list():
+    """Text printed by `ollama list`."""
+    lines = [f"{'NAME':<24}{'ID':<16}{'SIZE':<10}MODIFIED"]
+    for model in installed_models():
+        lines.append(f"{model:<24}{'000000000000':<16}{'0 B':<10}Just now")
+    return "\n".join(lines) + "\n"
+
+
+def list_models(args):
+    """Mimic `ollama list` output."""
+    sys.stdout.write(render_list())
+
+
+def pull_model(args):
+    """Mimic `ollama pull` output."""
+    print(f"pulling manifest for {args.model}")
+    print("success")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stub Ollama server and CLI for offline benchmarks.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = sub.add_parser("serve", help="Run the stub HTTP API")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=11434)
+    serve_parser.add_argument("--token-latency", type=float, default=5.0,
+                              help="Delay between generated tokens in milliseconds")
+    serve_parser.add_argument("--first-token-latency", type=float, default=20.0,
+                              help="Delay before the first token in milliseconds")
+    serve_parser.add_argument("--tokens", type=int, default=32,
+                              help="Number of tokens per completion")
+    serve_parser.add_argument("--embedding-dim", type=int, default=4096)
+    serve_parser.set_defaults(func=serve)
+
+    list_parser = sub.add_parser("list", help="List installed models")
+    list_parser.set_defaults(func=list_models)
+
+    pull_parser = sub.add_parser("pull", help="Pretend to pull a model")
+    pull_parser.add_argument("model")
+    pull_parser.set_defaults(func=pull_model)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
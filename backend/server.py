@@ -1,12 +1,17 @@
 #!/usr/bin/env python3
+import argparse
+import multiprocessing
 import os
 import sys
+import threading
 import uvicorn
-from app.main import app
 import logging
 
 SERVER_PORT = 8001
 
+# Number of server worker processes ("auto" uses one per CPU core)
+SERVER_WORKERS = os.getenv("SERVER_WORKERS", "1")
+
 if getattr(sys, 'frozen', False):
     # Running as compiled executable
     base_dir = sys._MEIPASS
@@ -18,8 +23,48 @@ else:
 os.environ['OLLAMA_DATA'] = os.path.join(base_dir, 'app', 'ollama')
 os.environ['OLLAMA_MODELS'] = os.path.join(base_dir, 'app', 'ollama', 'models')
 
+def resolve_workers(value: str) -> int:
+    """Parse a worker count, where "auto" means one worker per CPU core."""
+    if value == "auto":
+        return os.cpu_count() or 1
+    return max(1, int(value))
+
+def run_single():
+    """Serve the app from this process; its lifespan hook manages Ollama."""
+    from app.main import app
+
+    uvicorn.run(app, host="127.0.0.1", port=SERVER_PORT)
+
+def run_supervised(workers: int):
+    """Own the Ollama subprocess here and serve the app from `workers` processes.
+
+    Workers inherit OLLAMA_SUPERVISED so their lifespan hooks leave Ollama
+    alone, and share generation/embedding results through the file-backed
+    response cache.
+    """
+    os.environ["OLLAMA_SUPERVISED"] = "1"
+    from app import main
+
+    threading.Thread(target=main.start_ollama_in_background, daemon=True).start()
+    try:
+        uvicorn.run("app.main:app", host="127.0.0.1", port=SERVER_PORT, workers=workers)
+    finally:
+        main.terminate_ollama()
+
 if __name__ == "__main__":
+    # Worker processes are spawned by re-running this executable when frozen
+    multiprocessing.freeze_support()
+
+    parser = argparse.ArgumentParser(description="Run the FastAPI server.")
+    parser.add_argument("--workers", default=SERVER_WORKERS,
+                        help='Number of worker processes, or "auto" for one per CPU core')
+    args = parser.parse_args()
+
     try:
-        uvicorn.run(app, host="127.0.0.1", port=SERVER_PORT)
+        workers = resolve_workers(args.workers)
+        if workers == 1:
+            run_single()
+        else:
+            run_supervised(workers)
     except Exception as e:
         logging.error(f"Failed to start FastAPI server: {e}")
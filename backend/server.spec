@@ -26,7 +26,8 @@ exe = EXE(
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
+    # UPX-compressed libraries must be decompressed on every launch, slowing cold start
+    upx=False,
     upx_exclude=[],
     runtime_tmpdir=None,
     console=True,
@@ -0,0 +1,72 @@
+import json
+import sqlite3
+
+from app.cache import ResponseCache, cache_key, open_response_cache
+
+
+def test_values_round_trip(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.db"))
+    cache.set("docs", "Returns the sum.")
+    cache.set("nested", {"a": [1, 2.5, "x"]})
+    cache.set("embedding", [0.5, -0.25, 1.0])
+
+    assert cache.get("docs") == "Returns the sum."
+    assert cache.get("nested") == {"a": [1, 2.5, "x"]}
+    assert cache.get("embedding") == [0.5, -0.25, 1.0]
+    assert cache.get("missing") is None
+
+
+def test_embeddings_are_stored_as_float32(tmp_path):
+    path = str(tmp_path / "responses.db")
+    cache = ResponseCache(path)
+    embedding = [i / 4096 for i in range(4096)]
+    cache.set("embedding", embedding)
+
+    (size,) = sqlite3.connect(path).execute("SELECT size FROM entries").fetchone()
+    assert size == 4 * len(embedding)
+    assert max(abs(a - b) for a, b in zip(cache.get("embedding"), embedding)) < 1e-6
+
+
+def test_size_limit_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "responses.db")
+    max_bytes = 256 * 1024
+    # Two instances stand in for two worker processes writing alternately
+    caches = [ResponseCache(path, max_bytes=max_bytes), ResponseCache(path, max_bytes=max_bytes)]
+    value = "x" * 2000
+    for i in range(1000):
+        caches[i % 2].set(cache_key(str(i)), value)
+
+    assert caches[0].used_bytes() <= max_bytes
+    assert caches[1].get(cache_key("999")) == value
+    assert caches[1].get(cache_key("0")) is None
+
+
+def test_old_schema_is_replaced(tmp_path):
+    path = str(tmp_path / "responses.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE entries (key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)")
+    conn.execute("INSERT INTO entries VALUES ('k', ?, 0)", (json.dumps("old"),))
+    conn.commit()
+    conn.close()
+
+    cache = ResponseCache(path)
+    assert cache.get("k") is None
+    cache.set("k", "new")
+    assert ResponseCache(path).get("k") == "new"
+
+
+def test_corrupt_file_is_recreated(tmp_path):
+    path = tmp_path / "responses.db"
+    path.write_bytes(b"not a database" * 100)
+
+    cache = open_response_cache(str(path))
+    assert cache is not None
+    cache.set("k", "v")
+    assert cache.get("k") == "v"
+
+
+def test_unusable_path_disables_the_cache(tmp_path):
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+
+    assert open_response_cache(str(blocker / "cache" / "responses.db")) is None
@@ -0,0 +1,40 @@
+from app.evaluation import EvaluationCache, config_hash, exact_match_grader, run_evaluation
+
+
+def predict(example):
+    return {"response": example["input"].upper(), "steps": ["retrieve_documents", "generate_answer"]}
+
+
+def test_cached_predictions_are_skipped_on_rerun(tmp_path):
+    calls = []
+
+    def counting_predict(example):
+        calls.append(example["input"])
+        return predict(example)
+
+    examples = [{"input": "a", "output": "A"}, {"input": "b", "output": "x"}, {"input": "a", "output": "A"}]
+    path = str(tmp_path / "cache.json")
+    first = run_evaluation(examples, counting_predict, exact_match_grader, "exact_match",
+                           config_hash({"v": 1}), EvaluationCache(path))
+    second = run_evaluation(examples, counting_predict, exact_match_grader, "exact_match",
+                            config_hash({"v": 1}), EvaluationCache(path))
+
+    assert sorted(calls) == ["a", "b"]
+    assert first["accuracy"] == second["accuracy"] == 2 / 3
+    assert second["num_cached"] == 3
+
+
+def test_changed_grader_fingerprint_regrades():
+    cache = EvaluationCache(path=None)
+    examples = [{"input": "a", "output": "A"}]
+    grades = []
+
+    def grader(question, reference, prediction):
+        grades.append(question)
+        return 1.0
+
+    for fingerprint in ("prompt-v1", "prompt-v1", "prompt-v2"):
+        run_evaluation(examples, predict, grader, "llm", "pipeline", cache,
+                       grader_fingerprint=fingerprint)
+
+    assert grades == ["a", "a"]
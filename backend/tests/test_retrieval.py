@@ -0,0 +1,115 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from app.retrieval import BM25Index, HybridRetriever, tokenize
+
+AXES = ["python", "java", "rust", "sql", "docker", "kubernetes", "react", "vue"]
+
+
+@dataclass
+class Document:
+    page_content: str
+
+
+class KeywordEmbedding:
+    """One dimension per known keyword, so similarity follows shared keywords."""
+
+    def __init__(self):
+        self.queries = []
+
+    def _embed(self, text):
+        words = text.lower().split()
+        return [float(words.count(axis)) + 0.01 for axis in AXES]
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        self.queries.append(text)
+        return self._embed(text)
+
+
+def contents(docs):
+    return [d.page_content for d in docs]
+
+
+def test_fusion_prefers_documents_ranked_high_by_both():
+    retriever = HybridRetriever(KeywordEmbedding(), k=2)
+    retriever.add_documents([
+        Document("rust rust rust ownership"),
+        Document("python decorators explained"),
+        Document("python python packaging with wheels"),
+        Document("docker images"),
+    ])
+
+    assert contents(retriever.invoke("python packaging")) == [
+        "python python packaging with wheels",
+        "python decorators explained",
+    ]
+
+
+def test_vector_scan_tops_up_sparse_lexical_matches():
+    retriever = HybridRetriever(KeywordEmbedding(), k=2)
+    retriever.add_documents([Document("kubernetes kubernetes"), Document("sql joins"), Document("vue vue")])
+
+    # Only one document shares a term with the query; the second comes from the vector scan
+    assert contents(retriever.invoke("kubernetes deployment vue")) == ["kubernetes kubernetes", "vue vue"]
+
+
+def test_add_documents_is_incremental_and_invalidates_results():
+    embedding = KeywordEmbedding()
+    retriever = HybridRetriever(embedding, k=1)
+    retriever.add_documents([Document("java streams"), Document("sql indexes")])
+    assert contents(retriever.invoke("react hooks")) in (["java streams"], ["sql indexes"])
+    assert retriever.invoke("react hooks") == retriever.invoke("react hooks")
+
+    retriever.add_documents([Document("react hooks and react state")])
+    assert len(retriever) == 3
+    assert contents(retriever.invoke("react hooks")) == ["react hooks and react state"]
+    # The query embedding is cached across corpus versions
+    assert embedding.queries == ["react hooks"]
+
+
+def test_capped_postings_keep_highest_impact_documents():
+    token_lists = [["common"] + ["filler"] * 20 for _ in range(200)]
+    token_lists[137] = ["common"] * 5
+    uncapped, capped = BM25Index(), BM25Index(max_postings=16)
+    for index in (uncapped, capped):
+        index.add(token_lists[:100])
+        index.add(token_lists[100:])
+
+    ids, scores = capped.search(tokenize("common"), 5)
+    expected_ids, expected_scores = uncapped.search(tokenize("common"), 5)
+    assert ids[0] == expected_ids[0] == 137
+    np.testing.assert_allclose(scores, expected_scores, rtol=1e-6)
+
+
+def test_snapshot_ignores_documents_added_later():
+    index = BM25Index()
+    index.add([["alpha", "beta"], ["beta"]])
+    snapshot = index.snapshot(["beta"])
+    index.add([["beta", "beta"]] * 10)
+
+    ids, _ = snapshot.search(10)
+    assert sorted(ids.tolist()) == [0, 1]
+
+
+def test_very_common_terms_are_skipped_when_rarer_ones_match():
+    index = BM25Index()
+    index.add([["the_", "rare"]] + [["the_"]] * 9)
+
+    ids, _ = index.search(["the_", "rare"], 10)
+    assert ids.tolist() == [0]
+    assert len(index.search(["the_"], 10)[0]) == 10
+
+
+def test_caches_distinguish_queries_that_differ_only_in_symbols():
+    embedding = KeywordEmbedding()
+    retriever = HybridRetriever(embedding, k=1)
+    retriever.add_documents([Document("java memory"), Document("rust memory")])
+
+    for query in ("C++ memory", "C memory", "C# memory", "c#   MEMORY", "Ç memory"):
+        retriever.invoke(query)
+
+    assert embedding.queries == ["C++ memory", "C memory", "C# memory", "Ç memory"]
@@ -0,0 +1,116 @@
+from app.similarity import (
+    BANDS, BUCKET_LIMIT, REUSE_THRESHOLD, SimilarityIndex, generate_with_reuse, normalize_tokens,
+    open_similarity_index,
+)
+
+ADD_USER = '''def add_user(db, name, email):
+    """Insert a user and return its id."""
+    if not name or not email:
+        raise ValueError("name and email are required")
+    name = name.strip()
+    email = email.strip().lower()
+    if "@" not in email:
+        raise ValueError(f"invalid email address: {email}")
+    existing = db.execute("SELECT id FROM users WHERE email = ?", (email,)).fetchone()
+    if existing is not None:
+        raise ValueError(f"a user with email {email} already exists")
+    cursor = db.execute("INSERT INTO users (name, email) VALUES (?, ?)", (name, email))
+    db.commit()
+    return cursor.lastrowid
+'''
+
+
+def test_comment_markers_inside_strings_are_kept():
+    tokens = normalize_tokens('url = "http://example.com/a#top"  # homepage\n', abstract_identifiers=False)
+    assert tokens == ["url", "=", '"http://example.com/a#top"']
+
+
+def test_hash_is_kept_for_private_members_and_preprocessor_directives():
+    code = "#include <stdio.h>\nthis.#count += 1; // bump\n/* block */ x"
+    assert normalize_tokens(code, abstract_identifiers=False) == [
+        "#", "include", "<", "stdio", ".", "h", ">",
+        "this", ".", "#", "count", "+", "=", "1", ";", "x",
+    ]
+
+
+def test_abstracted_tokens_replace_names_and_literals():
+    assert normalize_tokens("total = price * 3 + 'x'", abstract_identifiers=True) == [
+        "ID", "=", "ID", "*", "NUM", "+", "STR",
+    ]
+
+
+def test_query_finds_near_duplicates_only(tmp_path):
+    index = SimilarityIndex(str(tmp_path / "similarity.db"), abstract_identifiers=False)
+    index.add("docs", index.fingerprint(ADD_USER), ADD_USER, "Adds a user.", "header")
+
+    match = index.query("docs", index.fingerprint(ADD_USER + "# trailing comment\n"))
+    assert match is not None and match.similarity == 1.0 and match.output == "Adds a user."
+    assert index.query("tests", index.fingerprint(ADD_USER)) is None
+    assert index.query("docs", index.fingerprint("def merge(a, b):\n    return sorted(a + b)\n")) is None
+
+
+def run(index, code, calls):
+    return generate_with_reuse(
+        index, "docs", code,
+        generate=lambda: calls.append("generate") or f"generated for {code.split('(')[0]}",
+        edit=lambda match: calls.append("edit") or f"edited from {match.output}",
+    )
+
+
+def test_renamed_copy_is_edited_not_reused(tmp_path):
+    index = SimilarityIndex(str(tmp_path / "similarity.db"), abstract_identifiers=False)
+    calls = []
+    run(index, ADD_USER, calls)
+
+    # Only a comment differs: returned as is
+    assert run(index, ADD_USER + "# note\n", calls) == "generated for def add_user"
+    # Same body under another name: the prior docs would name the wrong function
+    renamed = ADD_USER.replace("add_user", "delete_user")
+    assert index.query("docs", index.fingerprint(renamed)).similarity >= REUSE_THRESHOLD
+    assert run(index, renamed, calls) == "edited from generated for def add_user"
+    assert calls == ["generate", "edit"]
+
+    stats = index.stats()["docs"]
+    assert (stats["generated"], stats["reused"], stats["edited"]) == (1, 1, 1)
+
+
+def test_lookup_cost_is_bounded_when_many_units_share_buckets(tmp_path):
+    index = SimilarityIndex(str(tmp_path / "similarity.db"), abstract_identifiers=False)
+    signature = index.fingerprint(ADD_USER)
+    for i in range(10 * BUCKET_LIMIT):
+        index.add("docs", signature, ADD_USER, f"output {i}", "header")
+
+    candidates = index.candidates("docs", signature)
+    assert len(candidates) <= BANDS * BUCKET_LIMIT
+    # The newest units are kept
+    assert max(candidates) == 10 * BUCKET_LIMIT
+    assert index.query("docs", signature).similarity == 1.0
+
+
+def test_edits_of_the_same_definition_are_not_indexed(tmp_path):
+    index = SimilarityIndex(str(tmp_path / "similarity.db"), abstract_identifiers=False)
+    calls = []
+    run(index, ADD_USER, calls)
+    variant = ADD_USER.replace("db.commit()", "db.commit()\n    db.close()\n    log(name)\n    log(email)")
+    run(index, variant, calls)
+    run(index, variant.replace("add_user", "remove_user"), calls)
+
+    assert calls == ["generate", "edit", "edit"]
+    assert index.stats()["docs"]["indexed_units"] == 2
+
+
+def test_corrupt_index_is_recreated(tmp_path):
+    path = tmp_path / "similarity.db"
+    path.write_bytes(b"not a database" * 100)
+
+    index = open_similarity_index(str(path))
+    assert index is not None
+    assert run(index, ADD_USER, []) == "generated for def add_user"
+
+
+def test_unusable_path_disables_reuse(tmp_path):
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+
+    assert open_similarity_index(str(blocker / "cache" / "similarity.db")) is None
+    assert run(None, ADD_USER, []) == "generated for def add_user"
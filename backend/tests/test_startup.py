@@ -0,0 +1,13 @@
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("dotenv")
+
+from benchmarks.startup import DEFAULT_BUDGET_MS, importtime_report
+
+
+def test_app_import_is_lazy_and_within_budget():
+    report = importtime_report("app.main", 15)
+
+    assert report["eager_heavy_imports"] == []
+    assert report["total_ms"] <= DEFAULT_BUDGET_MS, report["slowest_packages_ms"]